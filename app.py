@@ -31,6 +31,7 @@ app.add_url_rule('/users_list', view_func=UsersListView.as_view('users_list'))
 app.add_url_rule('/user/<user_id>', view_func=UserPageView.as_view('user_page'))
 app.add_url_rule('/page/<page_name>', view_func=PageView.as_view('page'))
 app.add_url_rule('/page/<page_name>/history', view_func=PageHistoryView.as_view('page_history'))
+app.add_url_rule('/page/<page_name>/diff', view_func=PageDiffView.as_view('page_diff'))
 app.add_url_rule('/page/<page_name>/edit', view_func=PageEditView.as_view('page_edit'))
 app.add_url_rule('/page/create', view_func=PageCreateView.as_view('page_create'))
 app.add_url_rule('/page/restore', view_func=PageRestoreView.as_view('page_restore'))
@@ -42,6 +43,7 @@ app.add_url_rule('/all', view_func=AllPagesView.as_view('all_pages'))
 app.add_url_rule('/rules', view_func=RulesView.as_view('rules'))
 
 app.add_url_rule('/api/last_edits/', view_func=LastEditsAPIEndpoint.as_view('api_edits_api'))
+app.add_url_rule('/api/preview/', view_func=PagePreviewAPIEndpoint.as_view('api_preview'))
 
 if __name__ == "__main__":
     app.config['DEBUG'] = True
@@ -0,0 +1,9 @@
+from aiohttp import web
+
+from wikiloult.async_api import create_app
+from wikiloult.configs import get_config
+
+app = create_app(get_config())
+
+if __name__ == "__main__":
+    web.run_app(app, host="127.0.0.1", port=8081)
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from aiohttp import ClientSession, TCPConnector
+
+argparser = argparse.ArgumentParser(description="Compares the throughput of the flask and async last edits APIs")
+argparser.add_argument("--flask_url", default="http://127.0.0.1:5000/api/last_edits/")
+argparser.add_argument("--async_url", default="http://127.0.0.1:8081/api/last_edits/")
+argparser.add_argument("--requests", type=int, default=2000)
+argparser.add_argument("--concurrency", type=int, default=50)
+
+
+async def load_test(url: str, requests_count: int, concurrency: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests_count))
+
+    async def worker(session: ClientSession):
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            async with session.get(url) as response:
+                await response.read()
+                if response.status != 200:
+                    errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    total_time = time.perf_counter() - start
+
+    latencies.sort()
+    print(url)
+    print(f"    {requests_count / total_time:.1f} req/s, {errors} errors")
+    print(f"    latency: median {statistics.median(latencies) * 1000:.1f}ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms, "
+          f"max {latencies[-1] * 1000:.1f}ms")
+
+
+async def main(args):
+    for url in (args.flask_url, args.async_url):
+        await load_test(url, args.requests, args.concurrency)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(argparser.parse_args()))
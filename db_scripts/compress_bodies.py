@@ -0,0 +1,60 @@
+import argparse
+from itertools import islice
+
+from mongoengine import connect
+from pymongo import UpdateOne
+
+from wikiloult.fields import compress_string, decompress_string, check_compression
+from wikiloult.models import WikiPage, HistoryEntry
+
+COMPRESSED_FIELDS = [(WikiPage, "html_content"), (HistoryEntry, "markdown")]
+
+argparser = argparse.ArgumentParser(description="Compresses the pages' and history entries' bodies")
+argparser.add_argument("--db", default="wikiloult")
+argparser.add_argument("--compression", choices=["zlib", "zstd"], default="zlib",
+                       help="Should match the PAGE_BODIES_COMPRESSION setting")
+argparser.add_argument("--batch_size", type=int, default=500)
+argparser.add_argument("--revert", action="store_true",
+                       help="Stores the bodies back as plain strings")
+
+
+def batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+if __name__ == '__main__':
+
+    args = argparser.parse_args()
+    try:
+        check_compression(args.compression)
+    except ImportError as error:
+        argparser.error(str(error))
+    connect(args.db)
+
+    for document_cls, field_name in COMPRESSED_FIELDS:
+        print(f"Converting {document_cls.__name__}.{field_name}...")
+        field = document_cls._fields[field_name]
+        collection = document_cls._get_collection()
+        # only the documents still stored the other way round are converted
+        stored_type = "binData" if args.revert else "string"
+        documents = collection.find({field_name: {"$type": stored_type}}, {field_name: True})
+        updated_count = 0
+        for batch in batched(documents, args.batch_size):
+            updates = []
+            for document in batch:
+                if args.revert:
+                    new_value = decompress_string(document[field_name])
+                elif len(document[field_name]) >= field.min_size:
+                    new_value = compress_string(document[field_name], args.compression)
+                else:
+                    # too short to be worth compressing
+                    continue
+                updates.append(UpdateOne({"_id": document["_id"]}, {"$set": {field_name: new_value}}))
+            if updates:
+                updated_count += collection.bulk_write(updates, ordered=False).modified_count
+        print(f"Done, {updated_count} documents converted.")
@@ -0,0 +1,33 @@
+import argparse
+from mongoengine import connect
+from wikiloult.fields import set_compression
+from wikiloult.models import WikiPage
+
+argparser = argparse.ArgumentParser(description="Converts the pages' history entries to delta storage")
+argparser.add_argument("--db", default="wikiloult")
+argparser.add_argument("--snapshot_interval", type=int, default=20)
+argparser.add_argument("--revert", action="store_true",
+                       help="Converts the history entries back to full snapshots")
+argparser.add_argument("--compress", action="store_true",
+                       help="Compresses the rewritten snapshots, for wikis with COMPRESS_PAGE_BODIES enabled")
+argparser.add_argument("--compression", choices=["zlib", "zstd"], default="zlib",
+                       help="Should match the PAGE_BODIES_COMPRESSION setting")
+
+if __name__ == '__main__':
+
+    args = argparser.parse_args()
+    set_compression(args.compress, args.compression)
+    connect(args.db)
+    snapshot_interval = None if args.revert else args.snapshot_interval
+
+    print("Converting history entries...")
+    for page in WikiPage.objects.only("history").no_cache():
+        page: WikiPage
+        # all revisions are rebuilt before any entry is rewritten
+        history = [(entry, entry.revision_markdown) for entry in page.history]
+        parent = None
+        for entry, markdown in history:
+            entry.set_markdown(markdown, parent, snapshot_interval)
+            entry.save()
+            parent = entry
+    print("Done.")
@@ -0,0 +1,85 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from mongoengine import connect
+from pymongo import UpdateOne
+
+from wikiloult.fields import compress_string, decompress_string, get_compression
+from wikiloult.models import WikiPage
+from wikiloult.rendering import WikiPageRenderer, RENDERER_VERSION
+
+argparser = argparse.ArgumentParser(description="Re-renders the stored html of the wiki's pages")
+argparser.add_argument("--db", default="wikiloult")
+argparser.add_argument("--all", action="store_true",
+                       help="Re-renders all pages, not only those rendered by an older renderer version")
+argparser.add_argument("--workers", type=int, default=os.cpu_count())
+argparser.add_argument("--batch_size", type=int, default=100)
+
+
+def render_batch(pages):
+    """Renders a batch of raw page documents, and returns the (filter, update) pairs to apply.
+    Updates are conditioned on the page's last edit time, so pages edited
+    while this script runs aren't overwritten."""
+    markdown_renderer = WikiPageRenderer()
+    updates = []
+    for page in pages:
+        new_render = markdown_renderer.render_escaped(page["markdown_content"])
+        if new_render != decompress_string(page["html_content"]):
+            # the html is stored the same way it was, compressed or not
+            compression = get_compression(page["html_content"])
+            if compression is not None:
+                new_render = compress_string(new_render, compression)
+            new_values = {"html_content": new_render, "renderer_version": RENDERER_VERSION}
+        elif page.get("renderer_version") != RENDERER_VERSION:
+            new_values = {"renderer_version": RENDERER_VERSION}
+        else:
+            continue
+        updates.append(({"_id": page["_id"], "last_edit": page["last_edit"]}, {"$set": new_values}))
+    return updates
+
+
+def batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+if __name__ == '__main__':
+
+    args = argparser.parse_args()
+    connect(args.db)
+    collection = WikiPage._get_collection()
+
+    pages = WikiPage.objects.only("name", "markdown_content", "html_content",
+                                  "renderer_version", "last_edit").no_cache()
+    if not args.all:
+        pages = pages.filter(renderer_version__ne=RENDERER_VERSION)
+
+    print("Rendering pages...")
+    updated_count = 0
+
+    def write_updates(future):
+        global updated_count
+        updates = future.result()
+        if updates:
+            result = collection.bulk_write([UpdateOne(query, update) for query, update in updates],
+                                           ordered=False)
+            updated_count += result.modified_count
+
+    # only a few batches are in flight at once, so the pages are streamed from the db
+    # instead of being loaded all at once
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        pending = deque()
+        for batch in batched(pages.as_pymongo(), args.batch_size):
+            if len(pending) >= 2 * args.workers:
+                write_updates(pending.popleft())
+            pending.append(executor.submit(render_batch, batch))
+        while pending:
+            write_updates(pending.popleft())
+    print(f"Done, {updated_count} pages updated.")
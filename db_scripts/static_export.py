@@ -0,0 +1,134 @@
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from flask import render_template
+from mongoengine import disconnect
+
+from app import app, config
+from wikiloult.configs import set_up_db
+from wikiloult.models import WikiPage
+from wikiloult.rendering import RENDERER_VERSION
+
+# temporary files are dotfiles, so the web server can be set up to ignore them
+# (most setups already deny hidden files)
+TMP_FILE_PREFIX = ".export-tmp-"
+
+argparser = argparse.ArgumentParser(description="Exports the wiki as a static website")
+argparser.add_argument("output_dir", type=Path)
+argparser.add_argument("--state_file", type=Path,
+                       help="Where the last export's state is kept, outside of the published directory. "
+                            "Defaults to <output_dir>.export_state.json")
+argparser.add_argument("--full", action="store_true",
+                       help="Re-exports all pages, even those unchanged since the last export")
+argparser.add_argument("--workers", type=int, default=os.cpu_count())
+argparser.add_argument("--batch_size", type=int, default=50)
+
+
+def write_atomic(filepath: Path, content: str):
+    """Writes to a temporary file first, then moves it in place, so the web server
+    never serves a half-written page"""
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile("w", dir=filepath.parent, prefix=TMP_FILE_PREFIX,
+                            delete=False, encoding="utf-8") as tmp_file:
+        tmp_file.write(content)
+    os.chmod(tmp_file.name, 0o644)
+    os.replace(tmp_file.name, filepath)
+
+
+def init_worker():
+    # the mongo client inherited from the parent process can't be used after a fork
+    disconnect()
+    set_up_db(config)
+
+
+def export_pages(page_names, output_dir: Path):
+    # static_export hides the links to the pages that aren't exported (users, diffs).
+    # The edition and login links of the layout stay, and are dead in the mirror.
+    with app.test_request_context():
+        pages = WikiPage.objects(name__in=page_names)
+        for page in pages:
+            page: WikiPage
+            if page.is_render_stale:
+                page.refresh_render()
+            page_dir = output_dir / "page" / page.name
+            write_atomic(page_dir / "index.html",
+                         render_template("wiki_page.html", page=page, page_name=page.name,
+                                         static_export=True))
+            write_atomic(page_dir / "history" / "index.html",
+                         render_template("page_history.html",
+                                         page_history=reversed(page.history),
+                                         page_name=page.name,
+                                         static_export=True))
+    return len(page_names)
+
+
+def batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+if __name__ == '__main__':
+
+    args = argparser.parse_args()
+    output_dir: Path = args.output_dir.absolute()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state_filepath = args.state_file or output_dir.with_name(output_dir.name + ".export_state.json")
+    export_start = datetime.now()
+
+    # temporary files left over by an interrupted export, and the state file
+    # of earlier exports, which used to be kept in the published directory
+    for tmp_filepath in output_dir.rglob(TMP_FILE_PREFIX + "*"):
+        tmp_filepath.unlink()
+    (output_dir / ".export_state.json").unlink(missing_ok=True)
+
+    export_state = None
+    if state_filepath.is_file() and not args.full:
+        with open(state_filepath) as state_file:
+            export_state = json.load(state_file)
+
+    pages = WikiPage.objects.only("name").no_cache()
+    # re-rendering pages doesn't change their last edit time, so all pages are
+    # exported again when the renderer changed since the last export
+    if export_state is not None and export_state.get("renderer_version") == RENDERER_VERSION:
+        last_export = datetime.fromisoformat(export_state["last_export"])
+        print(f"Exporting pages edited since {last_export}...")
+        pages = pages.filter(last_edit__gt=last_export)
+    else:
+        print("Exporting all pages...")
+
+    page_names = (page.name for page in pages)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+        futures = [executor.submit(export_pages, batch, output_dir)
+                   for batch in batched(page_names, args.batch_size)]
+        exported_count = sum(future.result() for future in futures)
+    print(f"Done, {exported_count} pages exported.")
+
+    print("Removing deleted pages...")
+    existing_pages = set(page.name for page in WikiPage.objects.only("name").no_cache())
+    if (output_dir / "page").is_dir():
+        for page_dir in (output_dir / "page").iterdir():
+            if page_dir.name not in existing_pages:
+                shutil.rmtree(page_dir)
+    print("Done.")
+
+    print("Exporting listings and static files...")
+    with app.test_request_context():
+        write_atomic(output_dir / "index.html", render_template("homepage.html"))
+        write_atomic(output_dir / "all" / "index.html",
+                     render_template("all_pages.html",
+                                     pages_per_first_letter=WikiPage.get_all_pages_sorted()))
+    shutil.copytree(Path(app.root_path) / "static", output_dir / "static", dirs_exist_ok=True)
+    write_atomic(state_filepath, json.dumps({"last_export": export_start.isoformat(),
+                                             "renderer_version": RENDERER_VERSION}))
+    print("Done.")
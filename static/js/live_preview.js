@@ -0,0 +1,24 @@
+var previewTimeout = null;
+
+function updatePreview() {
+    var content = document.getElementById("content");
+    fetch(content.dataset.previewUrl, {
+        method: "POST",
+        credentials: "same-origin",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({content: content.value})
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.statusText);
+        }
+        return response.json();
+    }).then(function (data) {
+        document.getElementById("preview").innerHTML = data.html;
+        document.getElementById("preview-section").style.display = "";
+    }).catch(function () {});
+}
+
+document.getElementById("content").addEventListener("input", function () {
+    clearTimeout(previewTimeout);
+    previewTimeout = setTimeout(updatePreview, 500);
+});
@@ -0,0 +1,134 @@
+import unittest
+from datetime import datetime, timedelta
+
+from aiohttp.test_utils import AioHTTPTestCase
+from flask import Flask
+from mongoengine import connect, disconnect
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from wikiloult.async_api import create_app
+from wikiloult.configs import BaseConfig
+from wikiloult.models import User, WikiPage, HistoryEntry
+from wikiloult.views import LastEditsAPIEndpoint
+
+
+class TestConfig(BaseConfig):
+    MONGODB_SETTINGS = {
+        'db': 'wikiloult_test',
+        'host': '127.0.0.1',
+        'port': 27017}
+    SALT = "test_salt"
+    ADMIN_COOKIES = []
+
+
+def is_mongod_available():
+    settings = TestConfig.MONGODB_SETTINGS
+    try:
+        MongoClient(settings["host"], settings["port"], serverSelectionTimeoutMS=500).admin.command("ping")
+    except PyMongoError:
+        return False
+    return True
+
+
+@unittest.skipUnless(is_mongod_available(), "requires a local mongod")
+class AsyncAPITest(AioHTTPTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        settings = TestConfig.MONGODB_SETTINGS
+        db = connect(settings["db"], host=settings["host"], port=settings["port"])
+        db.drop_database(settings["db"])
+
+        # the flask app, serving the endpoint the async api should match
+        cls.flask_app = Flask(__name__)
+        cls.flask_app.config.from_object(TestConfig)
+        cls.flask_app.add_url_rule('/api/last_edits/', view_func=LastEditsAPIEndpoint.as_view('api_edits_api'))
+
+        with cls.flask_app.app_context():
+            WikiPage.ensure_indexes()
+            cls.alice = User.create_user("alice_cookie")
+            cls.bob = User.create_user("bob_cookie")
+            for user in (cls.alice, cls.bob):
+                user.is_allowed = True
+                user.save()
+
+            cat_page = WikiPage.create_page("chat", "Le chat", "Le chat miaule.", cls.alice)
+            cat_page.edit("Le chat miaule très fort.", "Le chat", cls.bob)
+            dog_page = WikiPage.create_page("chien", "Le chien", "Le chien aboie.", cls.bob)
+            dog_page.edit("Le chien aboie.\n\nIl est gentil.", "Le chien", cls.alice)
+            dog_page.edit("Le chien aboie.\n\nIl est très gentil.", "Le chien", cls.alice)
+
+        # edits made in the same millisecond can't be ordered by the db
+        start_time = datetime(2020, 1, 1)
+        for i, entry in enumerate(HistoryEntry.objects.order_by("id")):
+            entry.edition_time = start_time + timedelta(minutes=i)
+            entry.save()
+        for user in (cls.alice, cls.bob):
+            user.edits = list(HistoryEntry.objects(editor=user).order_by('+edition_time'))
+            user.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        settings = TestConfig.MONGODB_SETTINGS
+        MongoClient(settings["host"], settings["port"]).drop_database(settings["db"])
+        disconnect()
+        super().tearDownClass()
+
+    async def get_application(self):
+        return create_app(TestConfig)
+
+    async def test_page(self):
+        response = await self.client.get("/api/page/chat")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
+        page = await response.json()
+        self.assertEqual(page["name"], "chat")
+        self.assertEqual(page["title"], "Le chat")
+        self.assertEqual(page["markdown_content"], "Le chat miaule très fort.")
+        self.assertEqual(page["html_content"], WikiPage.objects.get(name="chat").html_content)
+
+    async def test_missing_page(self):
+        response = await self.client.get("/api/page/cheval")
+        self.assertEqual(response.status, 404)
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
+
+    async def test_pages_list(self):
+        response = await self.client.get("/api/pages/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.json(), [{"name": "chat", "title": "Le chat"},
+                                                 {"name": "chien", "title": "Le chien"}])
+
+    async def test_search(self):
+        response = await self.client.get("/api/search/", params={"query": "gentil"})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(await response.json(), [{"name": "chien", "title": "Le chien"}])
+
+    async def test_last_edits(self):
+        response = await self.client.get("/api/last_edits/")
+        self.assertEqual(response.status, 200)
+        last_edits = await response.json()
+        self.assertEqual([edit["name"] for edit in last_edits], ["chien", "chien", "chat"])
+        with self.flask_app.test_client() as flask_client:
+            self.assertEqual(last_edits, flask_client.get("/api/last_edits/").get_json())
+
+    async def test_user(self):
+        response = await self.client.get(f"/api/user/{self.alice.short_id}")
+        self.assertEqual(response.status, 200)
+        user = await response.json()
+        with self.flask_app.app_context():
+            self.assertEqual(user["fullname"], self.alice.poke_params.fullname)
+        self.assertEqual(user["short_id"], self.alice.short_id)
+        self.assertEqual(user["edits_count"], 3)
+
+    async def test_missing_user(self):
+        response = await self.client.get("/api/user/0000")
+        self.assertEqual(response.status, 404)
+
+    async def test_cors_preflight(self):
+        response = await self.client.options("/api/pages/",
+                                             headers={"Origin": "https://example.com",
+                                                      "Access-Control-Request-Method": "GET"})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers["Access-Control-Allow-Origin"], "*")
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+
+from mongoengine import Document
+
+from wikiloult.fields import CompressedStringField, compress_string, decompress_string, \
+    get_compression, set_compression, zstandard
+
+
+class CompressedDocument(Document):
+    body = CompressedStringField(required=True)
+
+
+class CompressStringTest(unittest.TestCase):
+
+    def test_zlib_round_trip(self):
+        value = "Le chat miaule. " * 100
+        compressed = compress_string(value, "zlib")
+        self.assertIsInstance(compressed, bytes)
+        self.assertEqual(get_compression(compressed), "zlib")
+        self.assertEqual(decompress_string(compressed), value)
+
+    @unittest.skipIf(zstandard is None, "requires the zstandard package")
+    def test_zstd_round_trip(self):
+        value = "Le chien aboie. " * 100
+        compressed = compress_string(value, "zstd")
+        self.assertEqual(get_compression(compressed), "zstd")
+        self.assertEqual(decompress_string(compressed), value)
+
+    @unittest.skipIf(zstandard is None, "requires the zstandard package")
+    def test_zstd_without_zstandard(self):
+        compressed = compress_string("Le chien aboie. " * 100, "zstd")
+        with patch("wikiloult.fields.zstandard", None):
+            with self.assertRaises(ImportError):
+                decompress_string(compressed)
+
+    def test_plain_string(self):
+        self.assertIsNone(get_compression("pas compressé"))
+        self.assertEqual(decompress_string("pas compressé"), "pas compressé")
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            compress_string("texte", "lzma")
+
+
+class CompressedStringFieldTest(unittest.TestCase):
+
+    def setUp(self):
+        set_compression(True, "zlib")
+
+    def tearDown(self):
+        set_compression(False)
+
+    def test_compressed_when_enabled(self):
+        document = CompressedDocument(body="x" * 1000)
+        stored = document.to_mongo()["body"]
+        self.assertEqual(get_compression(stored), "zlib")
+        self.assertEqual(decompress_string(stored), "x" * 1000)
+
+    def test_plain_when_disabled(self):
+        set_compression(False)
+        document = CompressedDocument(body="x" * 1000)
+        self.assertEqual(document.to_mongo()["body"], "x" * 1000)
+
+    def test_short_values_stay_plain(self):
+        document = CompressedDocument(body="court")
+        self.assertEqual(document.to_mongo()["body"], "court")
+
+    def test_mixed_values_readable(self):
+        plain = CompressedDocument._from_son({"_id": 1, "body": "x" * 1000})
+        compressed = CompressedDocument._from_son({"_id": 2, "body": compress_string("y" * 1000)})
+        self.assertEqual(plain.body, "x" * 1000)
+        self.assertEqual(compressed.body, "y" * 1000)
+
+    def test_lazy_decompression(self):
+        stored = compress_string("z" * 1000)
+        document = CompressedDocument._from_son({"_id": 1, "body": stored})
+        # kept compressed until accessed
+        self.assertIs(document._data["body"], stored)
+        self.assertEqual(document.body, "z" * 1000)
+        self.assertEqual(document._data["body"], "z" * 1000)
+        self.assertEqual(document._get_changed_fields(), [])
@@ -0,0 +1,76 @@
+import unittest
+
+from wikiloult.rendering import WikiPageRenderer, split_blocks, render_preview
+
+
+class SplitBlocksTest(unittest.TestCase):
+
+    def test_paragraphs(self):
+        self.assertEqual(split_blocks("# Titre\n\nUn paragraphe\nsur deux lignes\n\n\nUn autre"),
+                         ["# Titre\n\n", "Un paragraphe\nsur deux lignes\n\n\n", "Un autre"])
+
+    def test_trailing_newline(self):
+        self.assertEqual(split_blocks("a\n\nb\n"), ["a\n\n", "b\n"])
+
+    def test_fenced_code(self):
+        markdown = "Avant\n\n```\ncode\n\nencore du code\n```\n\nAprès"
+        self.assertEqual(split_blocks(markdown),
+                         ["Avant\n\n", "```\ncode\n\nencore du code\n```\n\n", "Après"])
+
+    def test_lists(self):
+        markdown = "- a\n- b\n\n- c\n    suite\n\n1. x\n\n2. y\n\nFin"
+        self.assertEqual(split_blocks(markdown),
+                         ["- a\n- b\n\n- c\n    suite\n\n1. x\n\n2. y\n\n", "Fin"])
+
+    def test_indented_code(self):
+        self.assertEqual(split_blocks("a\n\n    code\n\n    code2\n\nb"),
+                         ["a\n\n    code\n\n    code2\n\n", "b"])
+
+    def test_quotes(self):
+        self.assertEqual(split_blocks("> a\n\n> b\n\nc\n\n> d"),
+                         ["> a\n\n> b\n\n", "c\n\n", "> d"])
+
+    def test_list_after_paragraph(self):
+        self.assertEqual(split_blocks("para\n- a\n\n- b"), ["para\n- a\n\n- b"])
+        self.assertEqual(split_blocks("# H\n- a\n\n- b"), ["# H\n- a\n\n- b"])
+
+    def test_blank_lines_count(self):
+        self.assertEqual(split_blocks("- a\n\n\n\n    code"), ["- a\n\n\n\n    code"])
+
+
+class RenderPreviewTest(unittest.TestCase):
+
+    def assertSameAsSave(self, markdown: str):
+        self.assertEqual(render_preview(markdown), WikiPageRenderer().render_escaped(markdown))
+
+    def test_fenced_code(self):
+        self.assertSameAsSave("Avant\n\n```\ncode <b>\n\nencore du code\n```\n\n~~~\nautre\n~~~\n\nAprès")
+
+    def test_lists(self):
+        self.assertSameAsSave("- a\n- b\n\n- c\n    suite\n\n    indenté\n\n1. x\n2. y\n\n* z\n\nFin")
+
+    def test_indented_code(self):
+        self.assertSameAsSave("a\n\n    code\n\n    code2\nb\n\n\tcode3")
+
+    def test_quotes(self):
+        self.assertSameAsSave("> a\n\n> b\n> c\n\nd\n\n> e")
+
+    def test_wiki_links_and_escaping(self):
+        self.assertSameAsSave("Voir [[Le chat|chat]]\n\n<script>alert('a')</script>\n\n"
+                              "[[https://vocaroo.com/i/s1abcd]]")
+
+    def test_list_after_paragraph(self):
+        self.assertSameAsSave("para\n- a\n\n- b")
+        self.assertSameAsSave("# H\n- a\n\n- b")
+        self.assertSameAsSave("- a\ntexte\n\n- b")
+
+    def test_blank_lines_count(self):
+        self.assertSameAsSave("- a\n\n\n\n    code")
+        self.assertSameAsSave("- a\n\n\n- b\n\n\n\n\ttab")
+
+    def test_tables(self):
+        self.assertSameAsSave("| a | b |\n|---|---|\n\n> q\n\npara")
+        self.assertSameAsSave("| a | b |\n|---|---|\n| 1 | 2 |\n")
+
+    def test_reference_links(self):
+        self.assertSameAsSave("Un [lien][1]\n\nAutre paragraphe\n\n[1]: http://loult.family")
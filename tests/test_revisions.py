@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+
+from bson import ObjectId
+
+from wikiloult.models import HistoryEntry
+from wikiloult.revisions import make_delta, apply_delta, diff_lines
+
+
+class DeltaTest(unittest.TestCase):
+
+    def assertRoundTrip(self, old_text: str, new_text: str):
+        self.assertEqual(apply_delta(old_text, make_delta(old_text, new_text)), new_text)
+
+    def test_round_trip(self):
+        self.assertRoundTrip("a\nb\nc\n", "a\nB\nc\nd\n")
+        self.assertRoundTrip("a\nb\nc\n", "")
+        self.assertRoundTrip("", "a\nb\n")
+        self.assertRoundTrip("a\nb\nc\n", "c\nb\na\n")
+
+    def test_line_endings(self):
+        self.assertRoundTrip("a\r\nb\r\nc\r\n", "a\r\nB\r\nc\r\n")
+        self.assertRoundTrip("a\rb\rc\r", "a\rb\rC\r")
+        self.assertRoundTrip("a\nb\r\nc\rd", "a\r\nb\nc\rd\n")
+
+    def test_no_trailing_newline(self):
+        self.assertRoundTrip("a\nb", "a\nb\nc")
+        self.assertRoundTrip("a\nb\n", "a\nb")
+        self.assertRoundTrip("a", "b")
+
+    def test_unchanged_lines_are_copied(self):
+        delta = make_delta("a\nb\nc\n", "a\nb\nc\nd\n")
+        self.assertEqual(delta, [["=", 0, 3], ["+", ["d\n"]]])
+
+
+class DiffLinesTest(unittest.TestCase):
+
+    def test_diff_lines(self):
+        self.assertEqual(list(diff_lines("a\nb\nc", "a\nB\nc\nd")),
+                         [("equal", "a"), ("removed", "b"), ("added", "B"), ("equal", "c"), ("added", "d")])
+
+    def test_identical(self):
+        self.assertEqual(list(diff_lines("a\nb", "a\nb")), [("equal", "a"), ("equal", "b")])
+
+    def test_deletion(self):
+        self.assertEqual(list(diff_lines("a\nb\nc", "a\nc")),
+                         [("equal", "a"), ("removed", "b"), ("equal", "c")])
+
+
+class SnapshotIntervalTest(unittest.TestCase):
+
+    def test_snapshot_interval(self):
+        revisions = [f"titre\n\nversion {i}\n" for i in range(8)]
+        stored_revisions = {}
+        entries = []
+        # revisions are rebuilt from the previous ones, without any database
+        with patch("wikiloult.models.get_revision_markdown", side_effect=stored_revisions.__getitem__):
+            parent = None
+            for markdown in revisions:
+                entry = HistoryEntry(title="titre")
+                entry.id = ObjectId()
+                entry.set_markdown(markdown, parent, snapshot_interval=3)
+                stored_revisions[entry.id] = markdown
+                entries.append(entry)
+                parent = entry
+
+            self.assertEqual([entry.snapshot_distance for entry in entries], [0, 1, 2, 0, 1, 2, 0, 1])
+            self.assertEqual([entry.is_snapshot for entry in entries],
+                             [True, False, False, True, False, False, True, False])
+            self.assertEqual([entry.revision_markdown for entry in entries], revisions)
+
+    def test_delta_storage_disabled(self):
+        parent = HistoryEntry(title="titre")
+        parent.set_markdown("a\n")
+        entry = HistoryEntry(title="titre")
+        entry.set_markdown("b\n", parent)
+        self.assertTrue(entry.is_snapshot)
+        self.assertEqual(entry.snapshot_distance, 0)
+        self.assertEqual(entry.revision_markdown, "b\n")
@@ -0,0 +1,161 @@
+from typing import Type
+
+from aiohttp import web
+from cookie_factory import PokeParameters, hash_cookie
+from pymongo import AsyncMongoClient, DESCENDING, ASCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+from werkzeug.http import http_date
+
+from .configs import BaseConfig
+from .fields import decompress_string
+from .models import User, WikiPage, HistoryEntry
+
+PAGE_LIST_PROJECTION = {"title": True}
+PAGE_PROJECTION = {"title": True, "html_content": True, "markdown_content": True,
+                   "last_edit": True, "creation_time": True}
+
+config_key = web.AppKey("config", Type[BaseConfig])
+db_key = web.AppKey("db", AsyncDatabase)
+
+routes = web.RouteTableDef()
+
+
+def get_collection(request: web.Request, document_cls):
+    return request.app[db_key][document_cls._get_collection_name()]
+
+
+@web.middleware
+async def cors_middleware(request: web.Request, handler):
+    """Allows requests from any origin, like flask-cors does for the main app"""
+    if request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers:
+        # preflight request
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, HEAD, OPTIONS"
+        if "Access-Control-Request-Headers" in request.headers:
+            response.headers["Access-Control-Allow-Headers"] = request.headers["Access-Control-Request-Headers"]
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPException as exception:
+            exception.headers["Access-Control-Allow-Origin"] = "*"
+            raise
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def user_summary(user: dict, salt: str):
+    poke_params = PokeParameters.from_cookie_hash(hash_cookie(user["_id"], salt))
+    return {
+        "short_id": user["short_id"],
+        "fullname": poke_params.fullname,
+        "img_id": poke_params.img_id,
+        "color": poke_params.color
+    }
+
+
+@routes.get("/api/page/{page_name}")
+async def page_view(request: web.Request):
+    page = await get_collection(request, WikiPage).find_one({"_id": request.match_info["page_name"]},
+                                                            PAGE_PROJECTION)
+    if page is None:
+        raise web.HTTPNotFound()
+    return web.json_response({
+        "name": page["_id"],
+        "title": page["title"],
+        "html_content": decompress_string(page["html_content"]),
+        "markdown_content": page["markdown_content"],
+        "last_edit": http_date(page["last_edit"]),
+        "creation_time": http_date(page["creation_time"])
+    })
+
+
+@routes.get("/api/pages/")
+async def pages_list(request: web.Request):
+    cursor = get_collection(request, WikiPage).find({}, PAGE_LIST_PROJECTION).sort("title", ASCENDING)
+    return web.json_response([{"name": page["_id"], "title": page["title"]}
+                              async for page in cursor])
+
+
+@routes.get("/api/search/")
+async def search(request: web.Request):
+    query = request.query.get("query", "")
+    score = {"$meta": "textScore"}
+    cursor = (get_collection(request, WikiPage)
+              .find({"$text": {"$search": query}}, {**PAGE_LIST_PROJECTION, "score": score})
+              .sort([("score", score)])
+              .limit(50))
+    return web.json_response([{"name": page["_id"], "title": page["title"]}
+                              async for page in cursor])
+
+
+@routes.get("/api/last_edits/")
+async def last_edits(request: web.Request):
+    # same squashing of consecutive edits as HistoryEntry.get_last_edited_pages
+    last_edits = []
+    last_editor, last_page = None, None
+    cursor = (get_collection(request, HistoryEntry)
+              .find({}, {"editor": True, "page": True})
+              .sort("edition_time", DESCENDING)
+              .limit(30))
+    async for history_entry in cursor:
+        if history_entry["editor"] != last_editor or history_entry["page"] != last_page:
+            last_edits.append(history_entry)
+            last_editor, last_page = history_entry["editor"], history_entry["page"]
+    last_edits = last_edits[:3]
+
+    pages_cursor = get_collection(request, WikiPage).find(
+        {"_id": {"$in": [edit["page"] for edit in last_edits]}},
+        {"title": True, "last_edit": True})
+    pages = {page["_id"]: page async for page in pages_cursor}
+    editors_cursor = get_collection(request, User).find(
+        {"_id": {"$in": [edit["editor"] for edit in last_edits]}},
+        {"short_id": True})
+    editors = {editor["_id"]: editor async for editor in editors_cursor}
+
+    salt = request.app[config_key].SALT
+    history = []
+    for edit in last_edits:
+        page, editor = pages.get(edit["page"]), editors.get(edit["editor"])
+        if page is None or editor is None:
+            continue
+        editor_summary = user_summary(editor, salt)
+        del editor_summary["short_id"]
+        history.append({
+            "title": page["title"],
+            "name": page["_id"],
+            "time": http_date(page["last_edit"].date()),
+            "editor": editor_summary
+        })
+    return web.json_response(history)
+
+
+@routes.get("/api/user/{user_id}")
+async def user_view(request: web.Request):
+    user = await get_collection(request, User).find_one(
+        {"short_id": request.match_info["user_id"]},
+        {"short_id": True, "registration_date": True,
+         "edits_count": {"$size": {"$ifNull": ["$edits", []]}}})
+    if user is None:
+        raise web.HTTPNotFound()
+    summary = user_summary(user, request.app[config_key].SALT)
+    summary["registration_date"] = http_date(user["registration_date"])
+    summary["edits_count"] = user["edits_count"]
+    return web.json_response(summary)
+
+
+async def mongo_client(app: web.Application):
+    settings = app[config_key].MONGODB_SETTINGS
+    client = AsyncMongoClient(settings["host"], settings["port"])
+    app[db_key] = client[settings["db"]]
+    yield
+    await client.close()
+
+
+def create_app(config: Type[BaseConfig]) -> web.Application:
+    """Creates the read-only JSON API app. It relies on pymongo's async client,
+    so a single process can serve many concurrent requests"""
+    app = web.Application(middlewares=[cors_middleware])
+    app[config_key] = config
+    app.cleanup_ctx.append(mongo_client)
+    app.add_routes(routes)
+    return app
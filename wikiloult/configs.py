@@ -4,6 +4,8 @@ from pathlib import Path
 from mongoengine import connect
 import yaml
 
+from .fields import set_compression
+
 class BaseConfig:
     MONGODB_SETTINGS = {
         'db': 'wikiloult_dev',
@@ -11,6 +13,14 @@ class BaseConfig:
         'port': 27017}
     SALT = "loultgamennww"
     AUDIO_RENDER_FOLDER = Path(__file__).absolute().parent.parent / Path("static/sound/")
+    # store history entries as deltas against the previous revision,
+    # with a full snapshot every HISTORY_SNAPSHOT_INTERVAL revisions
+    HISTORY_DELTA_STORAGE = False
+    HISTORY_SNAPSHOT_INTERVAL = 20
+    # store the pages' html and the history's markdown compressed, with zlib or zstd.
+    # Existing documents are converted with db_scripts/compress_bodies.py
+    COMPRESS_PAGE_BODIES = False
+    PAGE_BODIES_COMPRESSION = "zlib"
 
 
 class DebugConfig(BaseConfig):
@@ -73,6 +83,7 @@ def get_config(flask_config=None):
 
 def set_up_db(config: BaseConfig):
     """Setting up the database based on a config object"""
+    set_compression(config.COMPRESS_PAGE_BODIES, config.PAGE_BODIES_COMPRESSION)
     connect(config.MONGODB_SETTINGS["db"],
             host=config.MONGODB_SETTINGS["host"],
             port=config.MONGODB_SETTINGS["port"])
\ No newline at end of file
@@ -0,0 +1,99 @@
+import zlib
+from typing import Optional
+
+from bson import Binary
+from mongoengine.base import BaseField
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ("zlib", "zstd")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# compression used when writing CompressedStringField values, set by set_compression
+# (called by configs.set_up_db). None means values are written as plain strings
+_write_compression: Optional[str] = None
+
+
+def check_compression(compression: str):
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression}")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("The zstandard package is required for zstd compression")
+
+
+def set_compression(enabled: bool, compression: str = "zlib"):
+    """Sets whether CompressedStringField values are written compressed, and how"""
+    global _write_compression
+    if enabled:
+        check_compression(compression)
+        _write_compression = compression
+    else:
+        _write_compression = None
+
+
+def get_compression(value) -> Optional[str]:
+    """Returns the compression of a stored value, or None if it's a plain string"""
+    if not isinstance(value, bytes):
+        return None
+    return "zstd" if value.startswith(ZSTD_MAGIC) else "zlib"
+
+
+def compress_string(value: str, compression: str = "zlib") -> Binary:
+    check_compression(compression)
+    data = value.encode("utf-8")
+    if compression == "zstd":
+        return Binary(zstandard.ZstdCompressor().compress(data))
+    return Binary(zlib.compress(data))
+
+
+def decompress_string(value):
+    """Decompresses a value stored by a CompressedStringField. Uncompressed strings
+    (small values, or documents that weren't migrated yet) are returned as is"""
+    compression = get_compression(value)
+    if compression is None:
+        return value
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("The zstandard package is required to read zstd compressed values")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    return zlib.decompress(value).decode("utf-8")
+
+
+class CompressedStringField(BaseField):
+    """String field that can be stored compressed (with zlib or zstd) in the database,
+    depending on the COMPRESS_PAGE_BODIES and PAGE_BODIES_COMPRESSION settings (see
+    set_compression). Values are kept compressed when documents are loaded, and only
+    decompressed when they're actually accessed. Plain and compressed values can both be read.
+    Values shorter than min_size aren't worth compressing and are stored as plain strings."""
+
+    def __init__(self, min_size=512, **kwargs):
+        self.min_size = min_size
+        super().__init__(**kwargs)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._data.get(self.name)
+        if isinstance(value, bytes):
+            # decompressed once, without marking the field as changed
+            value = decompress_string(value)
+            instance._data[self.name] = value
+        return value
+
+    def to_python(self, value):
+        return value
+
+    def to_mongo(self, value):
+        if isinstance(value, str) and len(value) >= self.min_size and _write_compression is not None:
+            return compress_string(value, _write_compression)
+        return value
+
+    def prepare_query_value(self, op, value):
+        return self.to_mongo(value)
+
+    def validate(self, value):
+        if not isinstance(value, (str, bytes)):
+            self.error("CompressedStringField only accepts string values")
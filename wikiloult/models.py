@@ -2,15 +2,18 @@ import re
 import unicodedata
 from collections import OrderedDict
 from datetime import datetime
-from html import escape
-from typing import List
+from functools import lru_cache
+from typing import List, Optional
 
 from cookie_factory import PokeParameters, PokeProfile, hash_cookie
 from flask import current_app
 from flask_login import UserMixin
-from mongoengine import Document, StringField, BooleanField, ReferenceField, DateTimeField, ListField, CASCADE, PULL
+from mongoengine import Document, StringField, BooleanField, ReferenceField, DateTimeField, ListField, CASCADE, PULL, \
+    IntField, LazyReferenceField
 
-from .rendering import WikiPageRenderer
+from .fields import CompressedStringField
+from .rendering import WikiPageRenderer, RENDERER_VERSION
+from .revisions import make_delta, apply_delta, diff_lines
 
 
 class User(Document, UserMixin):
@@ -51,18 +54,58 @@ class HistoryEntry(Document):
     editor = ReferenceField(User)
     page = ReferenceField('WikiPage')
     title = StringField(required=True)
-    markdown = StringField(required=True)
+    # full markdown of the revision. Not set if the revision is stored as a delta
+    markdown = CompressedStringField()
+    # delta against the parent revision, see revisions.make_delta
+    delta = ListField()
+    parent = LazyReferenceField('HistoryEntry')
+    # number of deltas to apply on the last full snapshot to rebuild this revision
+    snapshot_distance = IntField(default=0)
     edition_time = DateTimeField(default=datetime.now)
 
+    meta = {'indexes': [('page', 'edition_time')]}
+
+    @property
+    def is_snapshot(self):
+        return self.markdown is not None
+
+    @property
+    def revision_markdown(self) -> str:
+        if self.is_snapshot:
+            return self.markdown
+        return apply_delta(get_revision_markdown(self.parent.pk), self.delta)
+
     @property
     def render(self):
-        return WikiPageRenderer().render(escape(self.markdown))
+        return WikiPageRenderer().render_escaped(self.revision_markdown)
+
+    def set_markdown(self, markdown: str,
+                     parent: Optional['HistoryEntry'] = None,
+                     snapshot_interval: Optional[int] = None):
+        """Stores the revision's markdown as a delta against its parent revision,
+        or as a full snapshot if there is no parent, if delta storage is disabled
+        (no snapshot interval) or if the last snapshot is snapshot_interval revisions away"""
+        if (parent is None or not snapshot_interval
+                or parent.snapshot_distance + 1 >= snapshot_interval):
+            self.markdown = markdown
+            self.delta = []
+            self.parent = None
+            self.snapshot_distance = 0
+        else:
+            self.markdown = None
+            self.delta = make_delta(parent.revision_markdown, markdown)
+            self.parent = parent
+            self.snapshot_distance = parent.snapshot_distance + 1
+
+    def diff(self, other: 'HistoryEntry'):
+        """Line by line differences going from this revision to the other one"""
+        return diff_lines(self.revision_markdown, other.revision_markdown)
 
     @classmethod
     def get_last_edited_pages(cls, limit=30) -> List['WikiPage']:
         last_edited_pages = []
         last_editor, last_page = None, None
-        for history_entry in cls.objects().order_by("-edition_time")[:limit]:
+        for history_entry in cls.objects().only("editor", "page").order_by("-edition_time")[:limit]:
             if history_entry.editor != last_editor or history_entry.page != last_page:
                 page = history_entry.page
                 page.last_editor = history_entry.editor
@@ -75,8 +118,10 @@ class HistoryEntry(Document):
 class WikiPage(Document):
     name = StringField(primary_key=True)
     title = StringField(required=True)
-    html_content = StringField(required=True)
+    html_content = CompressedStringField(required=True)
+    # not compressed, since it's covered by the text index
     markdown_content = StringField(required=True)
+    renderer_version = IntField(default=0)
     history: List[HistoryEntry] = ListField(ReferenceField(HistoryEntry))
     last_edit: datetime = DateTimeField(default=datetime.now)
     creation_time: datetime = DateTimeField(default=datetime.now)
@@ -91,16 +136,17 @@ class WikiPage(Document):
     @classmethod
     def create_page(cls, name: str, title: str, markdown_content: str, editor: User):
         markdown_renderer = WikiPageRenderer()
-        page_render = markdown_renderer.render(escape(markdown_content))
+        page_render = markdown_renderer.render_escaped(markdown_content)
         new_page = cls(name=name,
                        title=title,
                        html_content=page_render,
-                       markdown_content=markdown_content)
+                       markdown_content=markdown_content,
+                       renderer_version=RENDERER_VERSION)
         new_page.save()
         first_edit = HistoryEntry(editor=editor,
                                   page=new_page,
-                                  title=title,
-                                  markdown=page_render)
+                                  title=title)
+        first_edit.set_markdown(markdown_content)
         first_edit.save()
         new_page.history.append(first_edit)
         new_page.save()
@@ -118,7 +164,7 @@ class WikiPage(Document):
     def squashed_history(self):
         last_editor = None
         history = []
-        for entry in self.history:
+        for entry in HistoryEntry.objects(page=self).only("editor").order_by("edition_time"):
             if last_editor != entry.editor:
                 history.append(entry)
                 last_editor = entry.editor
@@ -126,20 +172,41 @@ class WikiPage(Document):
 
     def edit(self, markdown_content: str, page_title: str, editor: User):
         markdown_renderer = WikiPageRenderer()
-        new_render = markdown_renderer.render(escape(markdown_content, quote=False))
+        new_render = markdown_renderer.render_escaped(markdown_content)
         history_entry = HistoryEntry(editor=editor,
                                      page=self,
-                                     markdown=markdown_content,
                                      title=page_title)
+        if current_app.config.get("HISTORY_DELTA_STORAGE", False):
+            snapshot_interval = current_app.config["HISTORY_SNAPSHOT_INTERVAL"]
+            history_entry.set_markdown(markdown_content, self.get_last_history_entry(), snapshot_interval)
+        else:
+            history_entry.set_markdown(markdown_content)
         history_entry.save()
         self.title = page_title
         self.markdown_content = markdown_content
         self.html_content = new_render
+        self.renderer_version = RENDERER_VERSION
         self.last_edit = datetime.now()
         self.history.append(history_entry)
         self.save()
         return history_entry
 
+    @property
+    def is_render_stale(self):
+        return self.renderer_version != RENDERER_VERSION
+
+    def refresh_render(self):
+        """Re-renders the page's html with the current renderer. The update is dropped
+        if the page was edited in the meantime, since that edit rendered it already"""
+        self.html_content = WikiPageRenderer().render_escaped(self.markdown_content)
+        self.renderer_version = RENDERER_VERSION
+        WikiPage.objects(name=self.name, last_edit=self.last_edit).update(
+            set__html_content=self.html_content,
+            set__renderer_version=self.renderer_version)
+
+    def get_last_history_entry(self) -> Optional[HistoryEntry]:
+        return HistoryEntry.objects(page=self).order_by("-edition_time").first()
+
     @classmethod
     def get_all_pages_sorted(cls):
         def remove_accents(text):
@@ -153,7 +220,7 @@ class WikiPage(Document):
             return text[0]
 
         per_first_letter = OrderedDict()
-        for page in cls.objects().order_by("title"):
+        for page in cls.objects().only("name", "title").order_by("title"):
             page: WikiPage
             first_letter = get_first_letter(remove_accents(page.title))
             if first_letter not in per_first_letter:
@@ -166,5 +233,18 @@ class WikiPage(Document):
         result = cls.objects().aggregate([{"$sample": {"size": 1}}])
         return next(result)
 
+
+@lru_cache(maxsize=128)
+def get_revision_markdown(entry_id) -> str:
+    """Rebuilds the markdown of a history entry from its last full snapshot.
+    The cache assumes the content of a history entry never changes once saved:
+    db_scripts/history_deltas.py rewrites entries, but always to the same content.
+    Its size is kept small, since each cached revision is a full page body"""
+    entry: HistoryEntry = HistoryEntry.objects.only("markdown", "delta", "parent").get(id=entry_id)
+    if entry.is_snapshot:
+        return entry.markdown
+    return apply_delta(get_revision_markdown(entry.parent.pk), entry.delta)
+
+
 WikiPage.register_delete_rule(HistoryEntry, 'page', CASCADE)
 HistoryEntry.register_delete_rule(User, 'edits', PULL)
\ No newline at end of file
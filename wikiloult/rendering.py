@@ -1,7 +1,15 @@
 import re
+from functools import lru_cache
+from html import escape
+from typing import List
+
 from mistune import Renderer, InlineLexer, Markdown
 import voxpopuli
 
+# to be bumped on any change to the rendering of pages, so the stored html
+# of older pages gets refreshed (see db_scripts/rerender_pages.py)
+RENDERER_VERSION = 1
+
 
 class WikiloultRenderer(Renderer):
 
@@ -63,6 +71,92 @@ class WikiPageRenderer:
     def render(self, page_string: str):
         return self.renderer(page_string)
 
+    def render_escaped(self, markdown: str):
+        """Renders user-submitted markdown, escaping any raw html it contains"""
+        return self.render(escape(markdown, quote=False))
+
+
+FENCE_REGEX = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+LIST_ITEM_REGEX = re.compile(r'^ {0,3}([*+-]|\d+\.)\s')
+BLOCKQUOTE_REGEX = re.compile(r'^ {0,3}>')
+TABLE_ALIGN_REGEX = re.compile(r'^ *\|?[-:| ]*-[-:| ]*$')
+# reference links and footnotes can be used from any block
+DEFINITION_REGEX = re.compile(r'^ {0,3}\[\^?[^\]]+\]:', re.MULTILINE)
+
+
+def is_continuation_line(line: str):
+    return line[:1] in (" ", "\t")
+
+
+def continues_block(block_lines: List[str], line: str):
+    """Whether a line coming after blank lines still belongs to the previous block:
+    an indented line, a list item or quote following a block that contains one, or
+    anything following a table without rows (which mistune renders differently
+    at the end of a document). Keeping too many lines together is harmless,
+    splitting a block isn't"""
+    if is_continuation_line(line):
+        return True
+    last_line = next((block_line for block_line in reversed(block_lines) if block_line), "")
+    if "|" in last_line and TABLE_ALIGN_REGEX.match(last_line):
+        return True
+    for regex in (LIST_ITEM_REGEX, BLOCKQUOTE_REGEX):
+        if regex.match(line) and any(regex.match(block_line) for block_line in block_lines
+                                     if not is_continuation_line(block_line)):
+            return True
+    return False
+
+
+def split_blocks(markdown: str) -> List[str]:
+    """Splits markdown into top-level blocks that can be rendered independently:
+    blank lines separate blocks, except inside fenced code. Indented blocks, list items
+    and quotes are kept with the list, code block or quote they continue.
+    Each block keeps the newlines that follow it, so joining the blocks gives back
+    the markdown (with normalized line endings)"""
+    blocks = []
+    current_lines = []
+    fence = None
+    for line in markdown.splitlines():
+        fence_match = FENCE_REGEX.match(line)
+        if fence is not None:
+            if fence_match is not None and fence_match.group(1).startswith(fence):
+                fence = None
+        elif fence_match is not None:
+            fence = fence_match.group(1)
+        elif not line.strip():
+            if current_lines:
+                blocks.append(current_lines)
+                current_lines = []
+            # blank lines are kept at the end of the block they follow, since
+            # their count matters (eg. two blank lines end a list)
+            if blocks:
+                blocks[-1].append("")
+            continue
+
+        if not current_lines and blocks and continues_block(blocks[-1], line):
+            current_lines = blocks.pop()
+        current_lines.append(line)
+    if current_lines:
+        blocks.append(current_lines)
+
+    blocks = ["\n".join(lines) + "\n" for lines in blocks]
+    if blocks and not markdown.endswith(("\n", "\r")):
+        blocks[-1] = blocks[-1][:-1]
+    return blocks
+
+
+@lru_cache(maxsize=4096)
+def render_block(block: str) -> str:
+    return WikiPageRenderer().render_escaped(block)
+
+
+def render_preview(markdown: str) -> str:
+    """Renders markdown block by block, so only the blocks that changed since
+    the last previews are actually rendered"""
+    if DEFINITION_REGEX.search(markdown):
+        # not cached, since this would fill the cache with whole documents
+        return WikiPageRenderer().render_escaped(markdown)
+    return "".join(render_block(block) for block in split_blocks(markdown))
+
 
 def audio_render(text, render_path):
     """Renders a text to the mwfe trademark voice"""
@@ -0,0 +1,55 @@
+from difflib import SequenceMatcher
+from typing import List, Iterator, Tuple
+
+# a delta is a list of operations to apply to the previous revision's lines:
+#  - ["=", start, end] : copy lines[start:end] from the previous revision
+#  - ["+", [line, ...]] : insert the given lines
+Delta = List[list]
+
+
+def _lines_opcodes(old_lines: List[str], new_lines: List[str]):
+    return SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes()
+
+
+def make_delta(old_text: str, new_text: str) -> Delta:
+    """Computes the line-based delta turning old_text into new_text"""
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    delta = []
+    for tag, i1, i2, j1, j2 in _lines_opcodes(old_lines, new_lines):
+        if tag == "equal":
+            delta.append(["=", i1, i2])
+        elif tag in ("replace", "insert"):
+            delta.append(["+", new_lines[j1:j2]])
+        # deleted lines are simply not copied
+    return delta
+
+
+def apply_delta(old_text: str, delta: Delta) -> str:
+    """Rebuilds a revision from the previous revision's text and its delta"""
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = []
+    for op in delta:
+        if op[0] == "=":
+            new_lines.extend(old_lines[op[1]:op[2]])
+        else:
+            new_lines.extend(op[1])
+    return "".join(new_lines)
+
+
+def diff_lines(old_text: str, new_text: str) -> Iterator[Tuple[str, str]]:
+    """Yields (status, line) tuples describing the differences between two revisions.
+    Status is either 'equal', 'removed' or 'added'"""
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    for tag, i1, i2, j1, j2 in _lines_opcodes(old_lines, new_lines):
+        if tag == "equal":
+            for line in old_lines[i1:i2]:
+                yield "equal", line
+            continue
+        if tag in ("replace", "delete"):
+            for line in old_lines[i1:i2]:
+                yield "removed", line
+        if tag in ("replace", "insert"):
+            for line in new_lines[j1:j2]:
+                yield "added", line
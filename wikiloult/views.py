@@ -1,4 +1,3 @@
-from html import escape
 from pathlib import Path
 import re
 
@@ -7,10 +6,10 @@ from flask.views import MethodView
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_login import LoginManager, logout_user, current_user, login_user, login_required
-from mongoengine import DoesNotExist, Q
+from mongoengine import DoesNotExist, Q, ValidationError
 
 from .models import User, WikiPage, HistoryEntry
-from .rendering import WikiPageRenderer, audio_render
+from .rendering import WikiPageRenderer, audio_render, render_preview
 
 current_user: User
 
@@ -130,6 +129,9 @@ class PageView(BaseMethodView):
             page: WikiPage = WikiPage.objects.get(name=page_name)
         except DoesNotExist:
             page = None
+        else:
+            if page.is_render_stale:
+                page.refresh_render()
         return render_template("wiki_page.html", page=page, page_name=page_name)
 
 
@@ -143,6 +145,22 @@ class PageHistoryView(BaseMethodView):
                                page_name=page_name)
 
 
+class PageDiffView(BaseMethodView):
+    """Display the differences between two edits of a page"""
+
+    def get(self, page_name: str):
+        try:
+            old_edit: HistoryEntry = HistoryEntry.objects.get(id=request.args.get('from'), page=page_name)
+            new_edit: HistoryEntry = HistoryEntry.objects.get(id=request.args.get('to'), page=page_name)
+        except (DoesNotExist, ValidationError):
+            return abort(404)
+        return render_template("page_diff.html",
+                               page_name=page_name,
+                               old_edit=old_edit,
+                               new_edit=new_edit,
+                               diff=old_edit.diff(new_edit))
+
+
 class PageEditView(BaseMethodView):
     """Page edition form"""
     decorators = [login_required]
@@ -163,7 +181,7 @@ class PageEditView(BaseMethodView):
         # if the user asked only for a preview, don't save and just render the page
         if request.form.get("preview", None) is not None:
             markdown_renderer = WikiPageRenderer()
-            page.html_content = markdown_renderer.render(escape(page.markdown_content, quote=False))
+            page.html_content = markdown_renderer.render_escaped(page.markdown_content)
             return render_template("page_edit.html", page=page, preview=True)
 
         # same if there's something missing
@@ -193,7 +211,7 @@ class PageRestoreView(BaseMethodView):
         history_entry: HistoryEntry = HistoryEntry.objects.get(id=edit_id)
         page = history_entry.page
         page.title = history_entry.title
-        page.markdown_content = history_entry.markdown
+        page.markdown_content = history_entry.revision_markdown
         return render_template("page_edit.html", page=page)
 
 
@@ -234,7 +252,7 @@ class PageCreateView(BaseMethodView):
 
         if request.form.get("preview", None) is not None:
             markdown_renderer = WikiPageRenderer()
-            html_render = markdown_renderer.render(escape(markdown_content, quote=False))
+            html_render = markdown_renderer.render_escaped(markdown_content)
             return render_template("page_create.html",
                                    page_content=markdown_content,
                                    page_title=title,
@@ -263,12 +281,28 @@ class PageCreateView(BaseMethodView):
         return redirect(url_for("page", page_name=page_name))
 
 
+class PagePreviewAPIEndpoint(BaseMethodView):
+    """Renders the preview of an edited page, for the live preview of the edition forms"""
+    decorators = [login_required]
+
+    def post(self):
+        editor: User = current_user._get_current_object()
+        if not editor.is_allowed:
+            return abort(401)
+
+        data = request.get_json(force=True, silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("content", ""), str):
+            return abort(400)
+        markdown_content = data.get("content", "")
+        return jsonify({"html": render_preview(markdown_content)})
+
+
 class SearchPageView(BaseMethodView):
     """Search for a wiki page"""
 
     def get(self):
         search_query = request.args.get('query', '')
-        results = list(WikiPage.objects.search_text(search_query))
+        results = list(WikiPage.objects.search_text(search_query).exclude("markdown_content"))
         return render_template("page_search.html", results_list=results)
 
 